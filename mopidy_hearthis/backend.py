@@ -4,6 +4,7 @@ import pykka
 from mopidy import backend
 
 from .library import HearthisLibraryProvider
+from .playback import HearthisPlaybackProvider
 
 logger = logging.getLogger(__name__)
 
@@ -14,5 +15,5 @@ class HeartthisBackend(pykka.ThreadingActor, backend.Backend):
     def __init__(self, config, audio):
         super().__init__()
         self.library = HearthisLibraryProvider(backend=self, config=config)
-        self.playback = None
+        self.playback = HearthisPlaybackProvider(audio=audio, backend=self)
         self.playlists = None
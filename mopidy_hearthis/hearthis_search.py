@@ -1,14 +1,27 @@
-import asyncio
 import logging
 import re
 import traceback
-from typing import List, NamedTuple, Tuple
+import weakref
+from contextlib import asynccontextmanager
+from datetime import date
+from types import SimpleNamespace
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
 
-import aiohttp
 from mopidy import models
-from pyhearthis.hearthis import FeedType, HearThis
 from pyhearthis.models import Category, SingleTrack
 
+if TYPE_CHECKING:
+    from pyhearthis.hearthis import FeedType
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,16 +35,16 @@ class ArtistNotFound(Exception):
 
 class TrackTuple(NamedTuple):
     uri: str
-    ref_uri: str
+    stream_uri: str
+    artist_uri: str
+    artwork_uri: str
     model_track: models.Track
-    single_track: SingleTrack
 
 
 class ArtistTuple(NamedTuple):
     uri: str
     permalink: str
     model_artist: models.Artist
-    artist: models.Artist
 
 
 class CategoryTuple(NamedTuple):
@@ -47,12 +60,56 @@ def create_artist_url(track_or_user_id) -> str:
     return f"hearthis:artist:{track_or_user_id}"
 
 
-def create_track_url(track_or_track_id) -> str:
+def create_track_url(track: SingleTrack) -> str:
+    # The permalinks let a track be reloaded from the api when it is not
+    # cached, e.g. for a tracklist restored after a restart
+    return f"hearthis:track:{track.id}:{track.user.permalink}:{track.permalink}"
+
+
+def create_track_key(uri: str) -> Optional[str]:
+    # Tracks are cached by id alone, so a bare hearthis:track:<id> and a uri
+    # with outdated permalinks resolve to the same entry
+    result = re.match("hearthis:track:(\\d+)", uri)
+    if result:
+        return f"hearthis:track:{result.group(1)}"
+
+    return None
+
+
+def parse_track_url(uri: str) -> Optional[Tuple[str, str]]:
+    result = re.match("hearthis:track:\\d+:([^:]+):(.+)$", uri)
+    if result:
+        return (result.group(1), result.group(2))
+
+    return None
+
+
+def run_async(coroutine):
+    # asyncio is only needed once we talk to the api, keep it off startup
+    import asyncio
+
+    return asyncio.run(coroutine)
 
-    if isinstance(track_or_track_id, SingleTrack):
-        return f"hearthis:track:{track_or_track_id.id}"
 
-    return f"hearthis:track:{track_or_track_id}"
+def create_track_date(track: SingleTrack) -> Optional[str]:
+
+    for value in (track.release_date, track.created_at):
+        if isinstance(value, date):
+            return value.strftime("%Y-%m-%d")
+        if isinstance(value, str) and re.match("\\d{4}-\\d{2}-\\d{2}", value):
+            return value[:10]
+
+    return None
+
+
+def create_track_length(track: SingleTrack) -> Optional[int]:
+
+    # reload_single_track doesn't cast the json, duration is a string there
+    duration = int(track.duration) if track.duration else 0
+    if duration > 0:
+        return duration * 1000
+
+    return None
 
 
 def pad_zero(value):
@@ -100,22 +157,29 @@ class HearThisLibrary:
 
     def _get_user(self):
         if self._user is None:
-            self._user = asyncio.run(self._login())
+            self._user = run_async(self._login())
         return self._user
 
-    async def _login(self):
+    @asynccontextmanager
+    async def _client(self):
+        # aiohttp and pyhearthis.hearthis are imported on first use,
+        # they add noticeably to mopidy's startup time otherwise
+        import aiohttp
+        from pyhearthis.hearthis import HearThis
+
         async with aiohttp.ClientSession() as session:
-            hearthis = HearThis(session)
+            yield HearThis(session)
+
+    async def _login(self):
+        async with self._client() as hearthis:
             return await hearthis.login(self._username, self._password)
 
     async def _search_async(self, user, query):
-        async with aiohttp.ClientSession() as session:
-            hearthis = HearThis(session)
+        async with self._client() as hearthis:
             return await hearthis.search(user, query, None, None, 1, 20)
 
-    async def _get_feed_async(self, user, feed_type: FeedType, page=1):
-        async with aiohttp.ClientSession() as session:
-            hearthis = HearThis(session)
+    async def _get_feed_async(self, user, feed_type: "FeedType", page=1):
+        async with self._client() as hearthis:
             return await hearthis.get_feeds(
                 user, feed_type=feed_type, page=page, count=self._page_count
             )
@@ -123,44 +187,66 @@ class HearThisLibrary:
     async def _get_tracks_from_category_async(
         self, user, category: Category, page=1
     ):
-        async with aiohttp.ClientSession() as session:
-            hearthis = HearThis(session)
+        async with self._client() as hearthis:
             return await hearthis.get_category_tracks(
                 user, category, page, self._page_count
             )
 
     def _get_tracks_from_category(self, user, category: Category, page=1):
-        return asyncio.run(
+        return run_async(
             self._get_tracks_from_category_async(user, category, page)
         )
 
     async def _get_categories_async(self):
-        async with aiohttp.ClientSession() as session:
-            hearthis = HearThis(session)
+        async with self._client() as hearthis:
             return await hearthis.get_categories()
 
     def _get_categories(self) -> List[Category]:
-        return asyncio.run(self._get_categories_async())
+        return run_async(self._get_categories_async())
 
     async def _get_artist_tracks_async(self, user, artist_permalink: str):
-        async with aiohttp.ClientSession() as session:
-            hearthis = HearThis(session)
+        async with self._client() as hearthis:
             return await hearthis.get_artist_tracks(user, artist_permalink)
 
     def _get_artist_tracks(self, user, artist_permalink: str):
-        return asyncio.run(
-            self._get_artist_tracks_async(user, artist_permalink)
+        return run_async(self._get_artist_tracks_async(user, artist_permalink))
+
+    async def _reload_track_async(
+        self, user, artist_permalink: str, track_permalink: str
+    ):
+        # reload_single_track only needs the two permalinks of the track
+        track = SimpleNamespace(
+            permalink=track_permalink,
+            user=SimpleNamespace(permalink=artist_permalink),
         )
+        async with self._client() as hearthis:
+            return await hearthis.reload_single_track(user, track)
 
-    def _track_as_ref(self, item: Tuple[ArtistTuple, TrackTuple]) -> models.Ref:
-        track_tuple = self._cache.get_track(item[1].single_track.stream_url)
+    def _reload_track(self, uri) -> Optional[TrackTuple]:
+        permalinks = parse_track_url(uri)
+        if permalinks is None:
+            logger.warning(f"Track {uri} is not cached and can't be reloaded")
+            return None
+
+        try:
+            user = self._get_user()
+            track = run_async(self._reload_track_async(user, *permalinks))
+        except Exception as e:
+            logger.warning(f"Reloading track {uri} failed: {e!r}")
+            return None
+
+        track_models = ModelFactory.create_track_models([track])
+        self._cache.add_models(track_models)
+        return track_models[0][1]
+
+    def _get_track(self, uri) -> Optional[TrackTuple]:
+        track_tuple = self._cache.get_track(uri)
         if track_tuple is None:
-            raise TrackNotFound()
+            track_tuple = self._reload_track(uri)
+        return track_tuple
 
-        return models.Ref.track(
-            uri=create_track_url(track_tuple.single_track),
-            name=track_tuple.single_track.title,
-        )
+    def _track_as_ref(self, item: Tuple[ArtistTuple, TrackTuple]) -> models.Ref:
+        return models.Ref.track(uri=item[1].uri, name=item[1].model_track.name)
 
     def _as_ref(
         self, track_models: List[Tuple[ArtistTuple, TrackTuple]]
@@ -168,10 +254,10 @@ class HearThisLibrary:
         return list(map(self._track_as_ref, track_models))
 
     def _search(self, user, query) -> List[SingleTrack]:
-        return asyncio.run(self._search_async(user, query))
+        return run_async(self._search_async(user, query))
 
-    def _get_feed(self, user, feed_type: FeedType, page=1):
-        return asyncio.run(self._get_feed_async(user, feed_type, page))
+    def _get_feed(self, user, feed_type: "FeedType", page=1):
+        return run_async(self._get_feed_async(user, feed_type, page))
 
     def browse(self, parent=None) -> List[models.Ref]:
         result = []
@@ -235,14 +321,41 @@ class HearThisLibrary:
         logger.debug("TODO lookup_categories")
         return []
 
+    def get_images(self, uris) -> Dict[str, List[models.Image]]:
+        result = {}
+        for uri in uris:
+            track_tuple = self._cache.get_track(uri)
+            if track_tuple is not None and track_tuple.artwork_uri:
+                result[uri] = [models.Image(uri=track_tuple.artwork_uri)]
+
+        return result
+
     def lookup_track(self, uri) -> List[models.Track]:
         logger.debug(f"lookup_track {uri}")
-        track_tuple = self._cache.get_track_by_ref_url(uri)
+        track_tuple = self._get_track(uri)
+        if track_tuple is None:
+            return []
+
         return [track_tuple.model_track]
 
+    def get_stream_url(self, uri) -> Optional[str]:
+        track_tuple = self._get_track(uri)
+        if track_tuple is None:
+            return None
+
+        return track_tuple.stream_uri
+
+    def get_distinct(self, field, query=None) -> Set[str]:
+        return self._cache.get_distinct(field, query)
+
     def get_feed(
-        self, feed_type: FeedType = FeedType.UNDEFINED, page=1
+        self, feed_type: "FeedType" = None, page=1
     ) -> List[models.Ref]:
+        from pyhearthis.hearthis import FeedType
+
+        if feed_type is None:
+            feed_type = FeedType.UNDEFINED
+
         user = self._get_user()
         tracks = self._get_feed(user, feed_type, page)
         track_models = ModelFactory.create_track_models(tracks)
@@ -250,6 +363,8 @@ class HearThisLibrary:
         return self._as_ref(track_models)
 
     def get_feed_paged(self, uri):
+        from pyhearthis.hearthis import FeedType
+
         page_result = re.match("hearthis\\:feed\\:(\\d+)?", uri)
         if page_result and page_result.group(1):
             return with_page_folders(
@@ -260,6 +375,8 @@ class HearThisLibrary:
         return with_page_folders(self.get_feed(), "hearthis:feed", 1)
 
     def get_news(self, uri) -> List[models.Ref]:
+        from pyhearthis.hearthis import FeedType
+
         page_result = re.match("hearthis\\:news\\:(\\d+)?", uri)
         if page_result and page_result.group(1):
             return with_page_folders(
@@ -319,38 +436,54 @@ class HearThisLibrary:
         return None
 
 
+def track_facets(track: models.Track) -> Iterable[Tuple[str, str]]:
+    for artist in track.artists:
+        if artist.name:
+            yield ("artist", artist.name)
+
+    if track.genre:
+        yield ("genre", track.genre)
+
+    if track.date:
+        yield ("date", track.date)
+
+
 class ModelCache:
     def __init__(self) -> None:
-        self._tracks_stream_url = {}
-        self._tracks_ref_url = {}
+        self._tracks = {}
         self._artist_tracks = {}
         self._artists = {}
         self._categories = {}
+        # field -> value -> keys of the cached tracks with that value
+        self._facets = {"artist": {}, "genre": {}, "date": {}}
 
     def add_model(
         self,
         model: Tuple[ArtistTuple, TrackTuple],
         complete_artist_tracks: bool = False,
     ):
-        if not model[1].single_track.stream_url in self._tracks_stream_url:
-            self._tracks_stream_url[model[1].single_track.stream_url] = model
-
-        ref_url = create_track_url(model[1].single_track)
-        if ref_url not in self._tracks_ref_url:
-            self._tracks_ref_url[ref_url] = model
+        artist_tuple, track_tuple = model
+        artist_url = track_tuple.artist_uri
+        track_key = create_track_key(track_tuple.uri)
+        is_new_track = track_key not in self._tracks
+        if is_new_track:
+            self._tracks[track_key] = track_tuple
+            for field, value in track_facets(track_tuple.model_track):
+                self._facets[field].setdefault(value, set()).add(track_key)
 
-        artist_url = create_artist_url(model[1].single_track)
         if artist_url not in self._artist_tracks:
-            self._artist_tracks[artist_url] = (complete_artist_tracks, [model])
-        else:
-            tmp = self._artist_tracks[artist_url]
             self._artist_tracks[artist_url] = (
                 complete_artist_tracks,
-                [*tmp[1], model],
+                [track_tuple],
             )
+        else:
+            tracks = self._artist_tracks[artist_url][1]
+            if is_new_track:
+                tracks.append(track_tuple)
+            self._artist_tracks[artist_url] = (complete_artist_tracks, tracks)
 
         if artist_url not in self._artists:
-            self._artists[artist_url] = model[0]
+            self._artists[artist_url] = artist_tuple
 
     def add_models(
         self,
@@ -369,7 +502,7 @@ class ModelCache:
 
     def get_artist_tracks(self, uri: str) -> List[TrackTuple]:
         if uri in self._artist_tracks:
-            return list(map(lambda t: t[1], self._artist_tracks[uri][1]))
+            return list(self._artist_tracks[uri][1])
 
     def get_artist(self, uri: str) -> ArtistTuple:
         if uri in self._artists:
@@ -395,37 +528,75 @@ class ModelCache:
         for category in categories:
             self.add_category(category)
 
-    def get_track_by_ref_url(self, ref_url) -> TrackTuple:
-        if ref_url in self._tracks_ref_url:
-            return self._tracks_ref_url[ref_url][1]
+    def get_track(self, uri: str) -> TrackTuple:
+        track_key = create_track_key(uri)
+        if track_key in self._tracks:
+            return self._tracks[track_key]
         return None
 
-    def get_track(self, stream_url: str) -> TrackTuple:
-        if stream_url in self._tracks_stream_url:
-            return self._tracks_stream_url[stream_url][1]
-        return None
+    def get_distinct(self, field: str, query: dict = None) -> Set[str]:
+        if field not in self._facets:
+            return set()
+
+        if not query:
+            return set(self._facets[field])
+
+        matches = None
+        for key, values in query.items():
+            if key not in self._facets:
+                return set()
+            for value in values:
+                uris = self._facets[key].get(value, set())
+                matches = uris if matches is None else matches & uris
+                if not matches:
+                    return set()
+
+        if matches is None:
+            return set(self._facets[field])
+
+        return {
+            value
+            for value, uris in self._facets[field].items()
+            if not uris.isdisjoint(matches)
+        }
 
 
 class ModelFactory:
+    # Mopidy already dedupes equal models, but only after building and
+    # validating them; looking the artist up by uri first skips that work
+    # for every further track of an uploader
+    _artists = weakref.WeakValueDictionary()
+
     @staticmethod
-    def _create_track(track: SingleTrack) -> Tuple[ArtistTuple, TrackTuple]:
+    def _create_artist(track: SingleTrack) -> ArtistTuple:
         artist_url = create_artist_url(track)
-        artist_name = track.user.username
-        artist_tuple = ArtistTuple(
-            artist_url,
-            None,
-            models.Artist(uri=artist_url, name=artist_name),
-            None,
-        )
+        model_artist = ModelFactory._artists.get(artist_url)
+        if model_artist is None or model_artist.name != track.user.username:
+            model_artist = models.Artist(
+                uri=artist_url, name=track.user.username
+            )
+            ModelFactory._artists[artist_url] = model_artist
+
+        return ArtistTuple(artist_url, track.user.permalink, model_artist)
+
+    @staticmethod
+    def _create_track(track: SingleTrack) -> Tuple[ArtistTuple, TrackTuple]:
+        artist_tuple = ModelFactory._create_artist(track)
+        track_url = create_track_url(track)
         track_tuple = TrackTuple(
+            track_url,
             track.stream_url,
-            create_track_url(track),
+            artist_tuple.uri,
+            track.artwork_url or track.thumb or None,
             models.Track(
                 name=track.title,
-                uri=track.stream_url,
+                uri=track_url,
                 artists=[artist_tuple.model_artist],
+                length=create_track_length(track),
+                date=create_track_date(track),
+                genre=track.genre or None,
+                comment=track.description or None,
             ),
-            track,
         )
         return (artist_tuple, track_tuple)
 
@@ -45,6 +45,25 @@ class HearthisLibraryProvider(backend.LibraryProvider):
             logger.exception(e)
             return []
 
+    def get_distinct(self, field, query=None):
+        try:
+            return self._hearthis_search.get_distinct(field, query)
+        except Exception as e:
+            traceback.print_exc()
+            logger.exception(e)
+            return set()
+
+    def get_stream_url(self, uri):
+        return self._hearthis_search.get_stream_url(uri)
+
+    def get_images(self, uris):
+        try:
+            return self._hearthis_search.get_images(uris)
+        except Exception as e:
+            traceback.print_exc()
+            logger.exception(e)
+            return {}
+
     def lookup(self, uri):
         try:
             if uri.startswith("hearthis:album"):
@@ -0,0 +1,12 @@
+import logging
+
+from mopidy import backend
+
+logger = logging.getLogger(__name__)
+
+
+class HearthisPlaybackProvider(backend.PlaybackProvider):
+    """Playback of hearthis:track uris via their stream url"""
+
+    def translate_uri(self, uri):
+        return self.backend.library.get_stream_url(uri)
@@ -0,0 +1,67 @@
+import time
+from typing import Callable, List, NamedTuple
+
+
+def percentile(samples: List[float], percent: float) -> float:
+    ordered = sorted(samples)
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    samples: List[float]
+    operations: int
+    elapsed: float
+
+    @property
+    def throughput(self) -> float:
+        return self.operations / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_row(self) -> str:
+        p50, p90, p99 = (
+            percentile(self.samples, p) * 1000 for p in (50, 90, 99)
+        )
+        return (
+            f"{self.name:<40} {self.throughput:>10.1f} "
+            f"{p50:>9.3f} {p90:>9.3f} {p99:>9.3f}"
+        )
+
+
+class MemoryResult(NamedTuple):
+    name: str
+    track_count: int
+    rss_bytes: int
+
+    def as_row(self) -> str:
+        return (
+            f"{self.name:<40} {self.track_count:>10} "
+            f"{self.rss_bytes / 2 ** 20:>9.1f} "
+            f"{self.rss_bytes / self.track_count:>9.0f}"
+        )
+
+
+results: List[BenchmarkResult] = []
+memory_results: List[MemoryResult] = []
+
+
+def measure(name: str, operation: Callable, rounds: int) -> BenchmarkResult:
+    samples = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        sample_start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - sample_start)
+    result = BenchmarkResult(name, samples, rounds, time.perf_counter() - start)
+    results.append(result)
+    return result
+
+
+def record(result: BenchmarkResult) -> BenchmarkResult:
+    results.append(result)
+    return result
+
+
+def record_memory(result: MemoryResult) -> MemoryResult:
+    memory_results.append(result)
+    return result
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+from pyhearthis.hearthis import HearThis
+
+from tests import benchmark_results
+from tests.hearthis_standin import HearThisStandIn
+
+# The benchmark suite runs a local server and a 100k track subprocess, it is
+# only collected when HEARTHIS_BENCHMARK=1 is set
+BENCHMARK_ENABLED = os.environ.get("HEARTHIS_BENCHMARK") == "1"
+BENCHMARK_ROUNDS = int(os.environ.get("HEARTHIS_BENCHMARK_ROUNDS", "20"))
+BENCHMARK_CACHED_TRACKS = int(
+    os.environ.get("HEARTHIS_BENCHMARK_CACHED_TRACKS", "100000")
+)
+
+
+@pytest.fixture
+def standin(request, monkeypatch):
+    # Parametrise indirectly with HearThisStandIn keyword arguments to change
+    # latency, error rate or seed
+    with HearThisStandIn(**getattr(request, "param", {})) as server:
+        monkeypatch.setattr(HearThis, "api_endpoint", server.url)
+        yield server
+
+
+@pytest.fixture
+def benchmark_rounds() -> int:
+    return BENCHMARK_ROUNDS
+
+
+@pytest.fixture
+def benchmark_cached_tracks() -> int:
+    return BENCHMARK_CACHED_TRACKS
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: performance benchmark, set HEARTHIS_BENCHMARK=1"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if BENCHMARK_ENABLED:
+        return
+
+    skip_benchmark = pytest.mark.skip(reason="set HEARTHIS_BENCHMARK=1")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
+def pytest_terminal_summary(terminalreporter):
+    results = benchmark_results.results
+    memory_results = benchmark_results.memory_results
+    if not results and not memory_results:
+        return
+
+    terminalreporter.section("hearthis benchmarks")
+    if results:
+        terminalreporter.write_line(
+            f"{'scenario':<40} {'ops/s':>10} {'p50 ms':>9} "
+            f"{'p90 ms':>9} {'p99 ms':>9}"
+        )
+        for result in results:
+            terminalreporter.write_line(result.as_row())
+
+    if memory_results:
+        terminalreporter.write_line(
+            f"{'scenario':<40} {'tracks':>10} {'rss MiB':>9} {'B/track':>9}"
+        )
+        for result in memory_results:
+            terminalreporter.write_line(result.as_row())
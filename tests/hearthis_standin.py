@@ -0,0 +1,249 @@
+import asyncio
+import random
+import socket
+import threading
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+
+def create_user_json(user_id: int) -> dict:
+    return {
+        "id": str(user_id),
+        "permalink": f"artist-{user_id}",
+        "username": f"Artist {user_id}",
+        "uri": f"https://api-v2.hearthis.at/artist-{user_id}/",
+        "permalink_url": f"https://hearthis.at/artist-{user_id}/",
+        "avatar_url": f"https://img.hearthis.at/avatar/{user_id}.jpg",
+        "caption": "",
+    }
+
+
+def create_track_json(track_id: int, user_id: int) -> dict:
+    return {
+        "id": str(track_id),
+        "created_at": "2021-02-02 12:00:00",
+        "private": "0",
+        "release_date": "2021-02-02 00:00:00",
+        "release_timestamp": "1612220400",
+        "geo": "",
+        "user_id": str(user_id),
+        "duration": str(1800 + track_id % 1800),
+        "permalink": f"track-{track_id}",
+        "description": "",
+        "downloadable": "1",
+        "genre": ("House", "Techno", "Drum & Bass", "Ambient")[track_id % 4],
+        "genre_slush": "",
+        "title": f"Track {track_id}",
+        "uri": f"https://api-v2.hearthis.at/artist-{user_id}/track-{track_id}/",
+        "permalink_url": f"https://hearthis.at/artist-{user_id}/track-{track_id}/",
+        "thumb": f"https://img.hearthis.at/thumb/{track_id}.jpg",
+        "artwork_url": f"https://img.hearthis.at/artwork/{track_id}.jpg",
+        "background_url": "",
+        "waveform_data": "",
+        "waveform_url": "",
+        "user": create_user_json(user_id),
+        "stream_url": f"https://hearthis.at/artist-{user_id}/track-{track_id}/listen/",
+        "download_url": "",
+        "playback_count": "0",
+        "download_count": "0",
+        "favoritings_count": "0",
+        "favorited": False,
+        "comment_count": "0",
+        "tags": "",
+        "taged_artists": "",
+        "bpm": "124",
+        "key": "",
+        "type": "Mix",
+        "license": "",
+        "version": "",
+        "artwork_url_retina": "",
+        "preview_url": "",
+        "download_filename": "",
+        "reshares_count": "0",
+        "reshared": False,
+        "played": False,
+        "liked": False,
+    }
+
+
+def create_synthetic_tracks(track_count: int, artist_count: int) -> List[dict]:
+    return [
+        create_track_json(track_id, 1000 + track_id % artist_count)
+        for track_id in range(1, track_count + 1)
+    ]
+
+
+def create_login_json() -> dict:
+    return {
+        "id": "1",
+        "permalink": "benchmark",
+        "username": "benchmark",
+        "caption": "",
+        "uri": "",
+        "permalink_url": "",
+        "thumb_url": "",
+        "avatar_url": "",
+        "720p_url": "",
+        "background_url": "",
+        "description": "",
+        "geo": "",
+        "track_count": "0",
+        "playlist_count": "0",
+        "likes_count": "0",
+        "followers_count": "0",
+        "following_count": "0",
+        "following": 0,
+        "premium": 0,
+        "allow_push": 0,
+        "email": "benchmark@example.com",
+        "locale": "en",
+        "secret": "secret",
+        "key": "key",
+    }
+
+
+CATEGORIES = [
+    {"id": "house", "name": "House", "url": "", "api_url": ""},
+    {"id": "techno", "name": "Techno", "url": "", "api_url": ""},
+    {"id": "ambient", "name": "Ambient", "url": "", "api_url": ""},
+]
+
+
+class HearThisStandIn:
+    """Local stand-in for the hearthis.at api
+
+    Serves recorded or synthetic json from a background thread, with a fixed
+    latency per request and a seeded error rate for the data routes.
+    """
+
+    def __init__(
+        self,
+        tracks: Optional[List[dict]] = None,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self._tracks = (
+            tracks if tracks is not None else create_synthetic_tracks(400, 40)
+        )
+        self._tracks_by_artist: Dict[str, List[dict]] = {}
+        for track in self._tracks:
+            permalink = track["user"]["permalink"]
+            self._tracks_by_artist.setdefault(permalink, []).append(track)
+
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.request_count = 0
+        self.error_count = 0
+
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self.url = None
+
+    @staticmethod
+    def _page(request: web.Request, items: List[dict]) -> List[dict]:
+        page = int(request.query.get("page", 1))
+        count = int(request.query.get("count", 5))
+        start = (page - 1) * count
+        return items[start : start + count]
+
+    async def _login(self, request: web.Request) -> web.Response:
+        return web.json_response(create_login_json())
+
+    async def _categories(self, request: web.Request) -> web.Response:
+        return web.json_response(CATEGORIES)
+
+    async def _category_tracks(self, request: web.Request) -> web.Response:
+        genre = request.match_info["category"]
+        tracks = [t for t in self._tracks if t["genre"].lower() == genre]
+        return web.json_response(self._page(request, tracks))
+
+    async def _feed(self, request: web.Request) -> web.Response:
+        tracks = self._tracks
+        if request.query.get("type") == "new":
+            tracks = list(reversed(tracks))
+        return web.json_response(self._page(request, tracks))
+
+    async def _search(self, request: web.Request) -> web.Response:
+        query = request.query.get("t", "").lower()
+        tracks = [
+            t
+            for t in self._tracks
+            if query in t["title"].lower()
+            or query in t["user"]["username"].lower()
+        ]
+        return web.json_response(self._page(request, tracks))
+
+    async def _single_track(self, request: web.Request) -> web.Response:
+        artist = request.match_info["artist"]
+        permalink = request.match_info["track"]
+        for track in self._tracks_by_artist.get(artist, []):
+            if track["permalink"] == permalink:
+                return web.json_response(track)
+
+        return web.json_response({"success": False}, status=404)
+
+    async def _artist_tracks(self, request: web.Request) -> web.Response:
+        tracks = self._tracks_by_artist.get(request.match_info["artist"], [])
+        return web.json_response(self._page(request, tracks))
+
+    @web.middleware
+    async def _simulate_network(self, request: web.Request, handler):
+        self.request_count += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        if request.path != "/login" and self.error_rate > 0:
+            if self._random.random() < self.error_rate:
+                self.error_count += 1
+                return web.json_response({"success": False}, status=500)
+
+        return await handler(request)
+
+    def _create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._simulate_network])
+        app.router.add_get("/login", self._login)
+        app.router.add_get("/categories/", self._categories)
+        app.router.add_get("/categories/{category}", self._category_tracks)
+        app.router.add_get("/feed/", self._feed)
+        app.router.add_get("/search/", self._search)
+        app.router.add_get("/{artist}/", self._artist_tracks)
+        app.router.add_get("/{artist}/{track}", self._single_track)
+        return app
+
+    def start(self) -> str:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        self.url = f"http://127.0.0.1:{sock.getsockname()[1]}/"
+
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(self._create_app())
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.SockSite(self._runner, sock)
+        self._loop.run_until_complete(site.start())
+
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, daemon=True
+        )
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self) -> "HearThisStandIn":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,305 @@
+import pathlib
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pyhearthis.hearthis import HearThis
+from pyhearthis.models import cast_dict
+
+from mopidy_hearthis.hearthis_search import (
+    HearThisLibrary,
+    ModelCache,
+    ModelFactory,
+)
+
+from tests.benchmark_results import (
+    BenchmarkResult,
+    MemoryResult,
+    measure,
+    record,
+    record_memory,
+)
+from tests.hearthis_standin import create_track_json
+
+pytestmark = pytest.mark.benchmark
+
+REPOSITORY_ROOT = pathlib.Path(__file__).parent.parent
+
+# Upper bound for the resident memory of one cached track, in bytes
+CACHED_TRACK_BUDGET = 2048
+
+MEMORY_BENCHMARK = """
+import gc
+import resource
+import sys
+
+from tests.test_benchmark import fill_cache
+
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+cache = fill_cache(int(sys.argv[1]))
+gc.collect()
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print((after - before) * (1 if sys.platform == "darwin" else 1024))
+"""
+
+
+def create_library() -> HearThisLibrary:
+    return HearThisLibrary("benchmark", "benchmark")
+
+
+def fill_cache(track_count: int, artist_count: int = 2000) -> ModelCache:
+    cache = ModelCache()
+    for page in range(1, track_count + 1, 20):
+        tracks = [
+            HearThis._json_to_track(
+                cast_dict(create_track_json(track_id, track_id % artist_count))
+            )
+            for track_id in range(page, min(page + 20, track_count + 1))
+        ]
+        cache.add_models(ModelFactory.create_track_models(tracks))
+    return cache
+
+
+def test_benchmark_browse(standin, benchmark_rounds):
+    sut = create_library()
+
+    result = measure("browse root", sut.browse, benchmark_rounds)
+
+    assert len(result.samples) == benchmark_rounds
+    assert standin.request_count == 0
+
+
+def test_benchmark_paged_feed_cold_and_warm(standin, benchmark_rounds):
+    # Arrange
+    pages = [f"hearthis:feed:{page + 1}" for page in range(benchmark_rounds)]
+
+    # Act
+    cold = measure(
+        "feed page (cold login)",
+        lambda: create_library().get_feed_paged(pages[0]),
+        benchmark_rounds,
+    )
+    sut = create_library()
+    sut.get_feed_paged(pages[0])
+    requests_before = standin.request_count
+    page_iter = iter(pages)
+    warm = measure(
+        "feed page (warm login)",
+        lambda: sut.get_feed_paged(next(page_iter)),
+        benchmark_rounds,
+    )
+
+    # Assert
+    assert len(cold.samples) == len(warm.samples)
+    assert standin.request_count - requests_before == benchmark_rounds
+
+
+def test_benchmark_categories_cold_and_warm(standin, benchmark_rounds):
+    # Arrange
+    sut = create_library()
+
+    # Act
+    measure(
+        "categories (cold)",
+        lambda: create_library().get_categories("hearthis:categories"),
+        benchmark_rounds,
+    )
+    sut.get_categories("hearthis:categories")
+    requests_before = standin.request_count
+    measure(
+        "categories (warm)",
+        lambda: sut.get_categories("hearthis:categories"),
+        benchmark_rounds,
+    )
+
+    # Assert
+    assert standin.request_count == requests_before
+
+
+def test_benchmark_search(standin, benchmark_rounds):
+    sut = create_library()
+    sut.search("warmup")
+
+    measure("search", lambda: sut.search("artist 10"), benchmark_rounds)
+
+    result = sut.search("artist 10")
+    assert result is not None
+    assert len(result.tracks) > 0
+
+
+def test_benchmark_artist_lookup_cold_and_warm(standin, benchmark_rounds):
+    # Arrange
+    sut = create_library()
+    refs = sut.get_feed_paged("hearthis:feed:1")
+    artists = list(
+        dict.fromkeys(
+            artist.uri
+            for ref in refs
+            if ref.type == "track"
+            for artist in sut.lookup_track(ref.uri)[0].artists
+        )
+    )
+    cold_artists = iter(artists)
+    requests_before = standin.request_count
+
+    # Act
+    measure(
+        "artist lookup (cold)",
+        lambda: sut.get_artist_tracks(next(cold_artists)),
+        len(artists),
+    )
+    cold_requests = standin.request_count - requests_before
+    requests_before = standin.request_count
+    measure(
+        "artist lookup (warm)",
+        lambda: sut.get_artist_tracks(artists[0]),
+        benchmark_rounds,
+    )
+
+    # Assert
+    assert cold_requests == len(artists)
+    assert standin.request_count == requests_before
+    assert len(sut.get_artist_tracks(artists[0])) > 0
+
+
+def test_benchmark_bulk_lookup(standin, benchmark_rounds):
+    # Arrange
+    sut = create_library()
+    uris = []
+    for page in range(1, 6):
+        refs = sut.get_feed_paged(f"hearthis:feed:{page}")
+        uris.extend(ref.uri for ref in refs if ref.type == "track")
+    requests_before = standin.request_count
+
+    # Act
+    result = measure(
+        f"bulk lookup ({len(uris)} tracks)",
+        lambda: [sut.lookup_track(uri) for uri in uris],
+        benchmark_rounds,
+    )
+
+    # Assert
+    assert result.operations == benchmark_rounds
+    assert standin.request_count == requests_before
+
+
+def test_benchmark_get_distinct(standin, benchmark_rounds):
+    # Arrange
+    sut = create_library()
+    for page in range(1, 6):
+        sut.get_feed_paged(f"hearthis:feed:{page}")
+    requests_before = standin.request_count
+
+    # Act
+    measure(
+        "get_distinct artist",
+        lambda: sut.get_distinct("artist"),
+        benchmark_rounds,
+    )
+    measure(
+        "get_distinct genre (artist query)",
+        lambda: sut.get_distinct("genre", {"artist": ["Artist 1010"]}),
+        benchmark_rounds,
+    )
+
+    # Assert
+    assert len(sut.get_distinct("artist")) == 40
+    assert sut.get_distinct("genre", {"artist": ["Artist 1010"]})
+    assert standin.request_count == requests_before
+
+
+def test_benchmark_get_distinct_large_cache(benchmark_rounds):
+    # Arrange
+    sut = fill_cache(10000)
+
+    # Act
+    measure(
+        "get_distinct genre (artist query, 10k)",
+        lambda: sut.get_distinct("genre", {"artist": ["Artist 10"]}),
+        benchmark_rounds,
+    )
+
+    # Assert
+    assert sut.get_distinct("genre", {"artist": ["Artist 10"]})
+
+
+@pytest.mark.parametrize(
+    "standin",
+    [{"latency": 0.005, "error_rate": 0.25, "seed": 1}],
+    indirect=True,
+)
+def test_benchmark_concurrent_clients(standin, benchmark_rounds):
+    # Arrange
+    client_count = 8
+
+    def run_client(client: int):
+        sut = create_library()
+        samples = []
+        for page in range(1, 4):
+            start = time.perf_counter()
+            refs = sut.get_feed_paged(f"hearthis:feed:{page}")
+            is_empty = not any(ref.type == "track" for ref in refs)
+            samples.append((time.perf_counter() - start, is_empty))
+        return samples
+
+    # Act
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=client_count) as executor:
+        client_samples = list(executor.map(run_client, range(client_count)))
+    elapsed = time.perf_counter() - start
+
+    # Assert
+    samples = [sample for client in client_samples for sample in client]
+    # pyhearthis turns a failed request into an empty page, so errored pages
+    # are reported on their own instead of as fast successes
+    pages = [duration for duration, is_empty in samples if not is_empty]
+    empty_pages = [duration for duration, is_empty in samples if is_empty]
+    assert len(samples) == client_count * 3
+    assert standin.request_count == client_count * 4
+    assert standin.error_count > 0
+    assert len(empty_pages) == standin.error_count
+
+    record(
+        BenchmarkResult(
+            f"feed page ({client_count} clients, 5ms)",
+            pages,
+            len(pages),
+            elapsed,
+        )
+    )
+    record(
+        BenchmarkResult(
+            f"feed page ({client_count} clients, 5ms, errored)",
+            empty_pages,
+            len(empty_pages),
+            elapsed,
+        )
+    )
+
+
+def test_benchmark_cached_tracks_memory(benchmark_cached_tracks):
+    # Act
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            MEMORY_BENCHMARK,
+            str(benchmark_cached_tracks),
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+        cwd=REPOSITORY_ROOT,
+    )
+
+    # Assert
+    result = record_memory(
+        MemoryResult(
+            "model cache rss",
+            benchmark_cached_tracks,
+            int(process.stdout),
+        )
+    )
+    assert result.rss_bytes < benchmark_cached_tracks * CACHED_TRACK_BUDGET
@@ -1,9 +1,20 @@
+import logging
 from datetime import datetime
+from types import SimpleNamespace
 
+from mopidy import models as mopidy_models
 from pyhearthis.models import SingleTrack, User
 
 from mopidy_hearthis import Extension
-from mopidy_hearthis.hearthis_search import ModelCache, ModelFactory
+from mopidy_hearthis.hearthis_search import (
+    HearThisLibrary,
+    ModelCache,
+    ModelFactory,
+)
+from mopidy_hearthis.library import HearthisLibraryProvider
+from mopidy_hearthis.playback import HearthisPlaybackProvider
+
+TRACK_1_URI = "hearthis:track:1:artist-101:track-1"
 
 
 def test_get_default_config():
@@ -24,9 +35,9 @@ def test_get_config_schema():
     assert "password" in schema
 
 
-def create_track(id, user_id, title) -> SingleTrack:
+def create_track(id, user_id, title, username="") -> SingleTrack:
     dt = datetime(2021, 2, 2)
-    user = User(user_id, "", "", "", "", "", "")
+    user = User(user_id, f"artist-{user_id}", username, "", "", "", "")
     return SingleTrack(
         id,
         dt,
@@ -36,7 +47,7 @@ def create_track(id, user_id, title) -> SingleTrack:
         "",
         user_id,
         0,
-        "",
+        f"track-{id}",
         "",
         1,
         "",
@@ -88,8 +99,106 @@ def test_that_modelfactory_creates_expected_result():
     assert len(result) == 2
     tuple1 = result[0]
     tuple2 = result[1]
-    assert tuple1[1].single_track.title == "Track 1"
-    assert tuple2[1].single_track.title == "Track 2"
+    assert tuple1[1].model_track.name == "Track 1"
+    assert tuple2[1].model_track.name == "Track 2"
+
+
+def test_that_modelfactory_builds_artist_once_per_uploader(monkeypatch):
+    # Arrange
+    created = []
+    create_artist = mopidy_models.Artist
+
+    def counting_artist(**kwargs):
+        created.append(kwargs["uri"])
+        return create_artist(**kwargs)
+
+    monkeypatch.setattr(mopidy_models, "Artist", counting_artist)
+    tracks = [
+        create_track(track_id, 9001, f"Track {track_id}", "Artist 9001")
+        for track_id in range(1, 4)
+    ]
+
+    # Act
+    result = ModelFactory.create_track_models(tracks)
+
+    # Assert
+    assert created == ["hearthis:artist:9001"]
+    assert result[0][0].model_artist is result[2][0].model_artist
+
+
+def test_that_modelfactory_rebuilds_artist_after_rename():
+    # Arrange
+    first_track = create_track(1, 9002, "Track 1", "Old name")
+    second_track = create_track(2, 9002, "Track 2", "New name")
+
+    # Act
+    result = ModelFactory.create_track_models([first_track, second_track])
+
+    # Assert
+    assert result[0][0].model_artist.name == "Old name"
+    assert result[1][0].model_artist.name == "New name"
+
+
+def test_that_modelfactory_does_not_keep_single_track():
+    # Arrange
+    track = create_track(1, 101, "Track 1")
+
+    # Act
+    result = ModelFactory.create_track_models([track])
+
+    # Assert
+    artist_tuple, track_tuple = result[0]
+    assert not any(isinstance(field, SingleTrack) for field in track_tuple)
+    assert not any(isinstance(field, SingleTrack) for field in artist_tuple)
+
+
+def test_that_modelfactory_maps_track_metadata():
+    # Arrange
+    track = create_track(1, 101, "Track 1")._replace(
+        duration=3600,
+        release_date="2020-12-24 00:00:00",
+        genre="House",
+        description="Live set",
+    )
+
+    # Act
+    result = ModelFactory.create_track_models([track])
+
+    # Assert
+    model_track = result[0][1].model_track
+    assert model_track.length == 3600000
+    assert model_track.date == "2020-12-24"
+    assert model_track.genre == "House"
+    assert model_track.comment == "Live set"
+
+
+def test_that_modelfactory_falls_back_to_created_at_and_omits_empty_fields():
+    # Arrange
+    track = create_track(1, 101, "Track 1")
+
+    # Act
+    result = ModelFactory.create_track_models([track])
+
+    # Assert
+    model_track = result[0][1].model_track
+    assert model_track.length is None
+    assert model_track.date == "2021-02-02"
+    assert model_track.genre is None
+    assert model_track.comment is None
+
+
+def test_that_get_images_returns_cached_artwork():
+    # Arrange
+    sut = HearThisLibrary("username", "password")
+    track = create_track(1, 101, "Track 1")
+    sut._cache.add_models(ModelFactory.create_track_models([track]))
+
+    # Act
+    result = sut.get_images([TRACK_1_URI, "hearthis:track:2"])
+
+    # Assert
+    assert list(result.keys()) == [TRACK_1_URI]
+    assert result[TRACK_1_URI][0].uri == "artwork"
 
 
 def test_that_model_cache_get_artist_tracks_returns_expected_data():
@@ -108,7 +217,7 @@ def test_that_model_cache_get_artist_tracks_returns_expected_data():
     assert result is not None
     assert len(result) == 1
     track = result[0]
-    assert track.single_track.title == "Track 1"
+    assert track.model_track.name == "Track 1"
 
 
 def test_that_model_cache_get_artist_returns_expected_data():
@@ -133,7 +242,7 @@ def test_that_model_cache_artist_tracks_complete_returns_expected_data():
     sut = ModelCache()
     first_track = create_track(1, 101, "Track 1")
     second_track = create_track(2, 201, "Track 2")
-    third_track = create_track(2, 101, "Track 3")
+    third_track = create_track(3, 101, "Track 3")
     tracks = [first_track, second_track]
     models = ModelFactory.create_track_models(tracks)
     sut.add_models(models)
@@ -157,7 +266,7 @@ def test_that_model_cache_add_models_adds_expected_artist_tracks():
     sut = ModelCache()
     first_track = create_track(1, 101, "Track 1")
     second_track = create_track(2, 201, "Track 2")
-    third_track = create_track(2, 101, "Track 3")
+    third_track = create_track(3, 101, "Track 3")
     tracks = [first_track, second_track]
     models = ModelFactory.create_track_models(tracks)
     sut.add_models(models)
@@ -186,11 +295,212 @@ def test_that_model_cache_get_track_returns_expected_data():
     sut.add_models(models)
 
     # Act
-    result = sut.get_track(first_track.stream_url)
+    result = sut.get_track(TRACK_1_URI)
 
     # Assert
     assert result is not None
+    assert result.model_track.uri == TRACK_1_URI
+    assert result.stream_uri == first_track.stream_url
+
+
+def test_that_model_cache_get_distinct_returns_facets():
+    # Arrange
+    sut = ModelCache()
+    first_track = create_track(1, 101, "Track 1", "Artist 1")._replace(
+        genre="House"
+    )
+    second_track = create_track(2, 201, "Track 2", "Artist 2")._replace(
+        genre="Techno"
+    )
+    models = ModelFactory.create_track_models([first_track, second_track])
+    sut.add_models(models)
+
+    # Act
+    artists = sut.get_distinct("artist")
+    genres = sut.get_distinct("genre")
+    dates = sut.get_distinct("date")
+
+    # Assert
+    assert artists == {"Artist 1", "Artist 2"}
+    assert genres == {"House", "Techno"}
+    assert dates == {"2021-02-02"}
+    assert sut.get_distinct("album") == set()
+
+
+def test_that_model_cache_does_not_index_a_track_twice():
+    # Arrange
+    sut = ModelCache()
+    first_track = create_track(1, 101, "Track 1", "Artist 1")._replace(
+        genre="House"
+    )
+    second_track = create_track(2, 201, "Track 2", "Artist 2")._replace(
+        genre="Techno"
+    )
+    models = ModelFactory.create_track_models([first_track, second_track])
+    sut.add_models(models)
+
+    # Act
+    sut.add_models(models)
+
+    # Assert
+    assert len(sut.get_artist_tracks("hearthis:artist:101")) == 1
+    assert sut.get_distinct("genre") == {"House", "Techno"}
+    assert sut.get_distinct("artist", {"genre": ["House"]}) == {"Artist 1"}
+
+
+def test_that_model_cache_get_distinct_ignores_empty_query_values():
+    # Arrange
+    sut = ModelCache()
+    track = create_track(1, 101, "Track 1", "Artist 1")
+    sut.add_models(ModelFactory.create_track_models([track]))
+
+    # Act
+    result = sut.get_distinct("artist", {"date": []})
+
+    # Assert
+    assert result == {"Artist 1"}
+
+
+def test_that_model_cache_resolves_every_form_of_a_track_uri():
+    # Arrange
+    sut = ModelCache()
+    track = create_track(1, 101, "Track 1", "Artist 1")
+    sut.add_models(ModelFactory.create_track_models([track]))
+
+    # Act
+    bare = sut.get_track("hearthis:track:1")
+    outdated = sut.get_track("hearthis:track:1:artist-101:old-permalink")
+
+    # Assert
+    assert bare is not None
+    assert outdated is bare
+    assert bare.uri == TRACK_1_URI
+
+
+def test_that_model_cache_indexes_track_once_after_permalink_change():
+    # Arrange
+    sut = ModelCache()
+    track = create_track(1, 101, "Track 1", "Artist 1")
+    renamed = track._replace(permalink="renamed")
+    sut.add_models(ModelFactory.create_track_models([track]))
+
+    # Act
+    sut.add_models(ModelFactory.create_track_models([renamed]))
+
+    # Assert
+    assert len(sut.get_artist_tracks("hearthis:artist:101")) == 1
+    assert sut.get_distinct("date", {"artist": ["Artist 1"]}) == {"2021-02-02"}
+
+
+def test_that_lookup_of_bare_track_uri_uses_cache(caplog):
+    # Arrange
+    sut = create_library_provider()
+    track = create_track(1, 101, "Track 1")
+    sut._hearthis_search._cache.add_models(
+        ModelFactory.create_track_models([track])
+    )
+
+    # Act
+    tracks = sut.lookup("hearthis:track:1")
+    images = sut.get_images(["hearthis:track:1"])
+
+    # Assert
+    assert [t.uri for t in tracks] == [TRACK_1_URI]
+    assert images["hearthis:track:1"][0].uri == "artwork"
+    assert not caplog.records
+
+
+def test_that_model_cache_get_distinct_applies_query():
+    # Arrange
+    sut = ModelCache()
+    first_track = create_track(1, 101, "Track 1", "Artist 1")._replace(
+        genre="House"
+    )
+    second_track = create_track(2, 201, "Track 2", "Artist 2")._replace(
+        genre="Techno"
+    )
+    sut.add_models(
+        ModelFactory.create_track_models([first_track, second_track])
+    )
+
+    # Act
+    result = sut.get_distinct("genre", {"artist": ["Artist 2"]})
+    combined = sut.get_distinct(
+        "date", {"artist": ["Artist 2"], "genre": ["House"]}
+    )
+    unsupported = sut.get_distinct("genre", {"album": ["Album"]})
+
+    # Assert
+    assert result == {"Techno"}
+    assert combined == set()
+    assert unsupported == set()
+
+
+def test_that_get_stream_url_returns_cached_stream_url():
+    # Arrange
+    sut = HearThisLibrary("username", "password")
+    track = create_track(1, 101, "Track 1")
+    sut._cache.add_models(ModelFactory.create_track_models([track]))
+
+    # Act
+    result = sut.get_stream_url(TRACK_1_URI)
+
+    # Assert
+    assert result == track.stream_url
+    assert sut.get_stream_url("hearthis:track:2") is None
 
 
 def test_that_get_artist_tracks_returns_expected_data():
     pass
+
+
+def create_library_provider() -> HearthisLibraryProvider:
+    config = {"hearthis": {"username": "username", "password": "password"}}
+    return HearthisLibraryProvider(backend=None, config=config)
+
+
+def test_that_lookup_reloads_track_missing_from_cache(standin, caplog):
+    # Arrange
+    sut = create_library_provider()
+    uri = "hearthis:track:5:artist-1005:track-5"
+
+    # Act
+    result = sut.lookup(uri)
+
+    # Assert
+    assert len(result) == 1
+    assert result[0].uri == uri
+    assert result[0].name == "Track 5"
+    assert result[0].length == 1805000
+    assert not caplog.records
+
+
+def test_that_translate_uri_reloads_track_missing_from_cache(standin, caplog):
+    # Arrange
+    library = create_library_provider()
+    sut = HearthisPlaybackProvider(
+        audio=None, backend=SimpleNamespace(library=library)
+    )
+
+    # Act
+    result = sut.translate_uri("hearthis:track:5:artist-1005:track-5")
+
+    # Assert
+    assert result == "https://hearthis.at/artist-1005/track-5/listen/"
+    assert not caplog.records
+
+
+def test_that_lookup_of_unknown_track_warns_without_traceback(standin, caplog):
+    # Arrange
+    sut = create_library_provider()
+
+    # Act
+    unknown = sut.lookup("hearthis:track:5:artist-1005:missing")
+    legacy = sut.lookup("hearthis:track:5")
+
+    # Assert
+    assert unknown == []
+    assert legacy == []
+    assert len(caplog.records) == 2
+    assert all(r.levelno == logging.WARNING for r in caplog.records)
+    assert all(r.exc_info is None for r in caplog.records)
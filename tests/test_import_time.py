@@ -0,0 +1,59 @@
+import pathlib
+import subprocess
+import sys
+
+REPOSITORY_ROOT = pathlib.Path(__file__).parent.parent
+
+# Modules mopidy itself has loaded before it sets up any extension
+MOPIDY_PRELOADED = "import mopidy.backend, mopidy.config, mopidy.models, pykka"
+
+# Upper bound for the cumulative import time of mopidy_hearthis.backend, in
+# microseconds, measured on top of what mopidy has already loaded. The
+# import takes about 10-12ms, so the budget leaves room for slower CI
+# machines, while pulling aiohttp back onto the startup path adds well over
+# 100ms and still fails it.
+IMPORT_TIME_BUDGET = 50000
+
+
+def import_times(statement: str) -> dict:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+        cwd=REPOSITORY_ROOT,
+    )
+
+    result = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        result[name.strip()] = int(cumulative)
+    return result
+
+
+def test_backend_import_does_not_load_network_stack():
+    result = import_times(f"{MOPIDY_PRELOADED}; import mopidy_hearthis.backend")
+
+    assert "mopidy_hearthis.backend" in result
+    assert "aiohttp" not in result
+    assert "pyhearthis.hearthis" not in result
+
+
+def test_config_schema_does_not_load_network_stack():
+    result = import_times(
+        f"{MOPIDY_PRELOADED}; import mopidy_hearthis; "
+        "mopidy_hearthis.Extension().get_config_schema()"
+    )
+
+    assert "mopidy_hearthis" in result
+    assert "aiohttp" not in result
+    assert "pyhearthis" not in result
+
+
+def test_backend_import_time_is_within_budget():
+    result = import_times(f"{MOPIDY_PRELOADED}; import mopidy_hearthis.backend")
+
+    # The backend's cumulative time includes the mopidy_hearthis package
+    assert result["mopidy_hearthis.backend"] < IMPORT_TIME_BUDGET